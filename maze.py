@@ -1,19 +1,38 @@
+import importlib
+import importlib.util
+
 def import_or_install(packagename: str):
-    try:
-        return __import__(packagename)
-    except ImportError:
+    if importlib.util.find_spec(packagename) is None:
+        # Only needed when installing, so don't load them on every start
+        import subprocess
+        import sys
         rc = subprocess.check_call([sys.executable, "-m", "pip", "install", packagename])
         if rc != 0:
             raise RuntimeError(f"Could not install required package '{packagename}'!")
-        return __import__(packagename)
+        importlib.invalidate_caches()
+    return __import__(packagename)
 
 pygame_import = import_or_install("pygame")
 if pygame_import is not None:
     import pygame
 
-import enum
-import collections
+numpy_import = import_or_install("numpy")
+if numpy_import is not None:
+    import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """
+        Stand-in for numba.njit when Numba is not installed; leaves the function as plain Python.
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 import random
+from functools import lru_cache
 
 # Settings
 SCRIPT_TITLE = "Maze test"
@@ -34,172 +53,285 @@ LINE_WIDTH_GOAL: int = int(BLOCK_SIZE / 2) - 2
 
 DEFAULT_STARTPOS: tuple[int, int] = (0, 0)
 DEFAULT_SEED = 1234
+RNG_BATCH_SIZE: int = 1 << 16
+
+# Properties a cell in the maze can have. Only the path bits are stored, packed as one nibble
+# per cell (two cells per byte). A cell has been visited if it has a path, or is the start cell.
+CLEAR: int = 0 # Default value
+PATH_N: int = 1 # Connected to nothern neighbor
+PATH_E: int = 2 # Connected to eastern neighbor
+PATH_S: int = 4 # Connected to southern neighbor
+PATH_W: int = 8 # Connected to western neighbor
+VISITED: int = 16 # Cell has been visited
+
+# Direction identifiers
+NORTH, EAST, SOUTH, WEST = 0, 1, 2, 3
+
+# Directions
+_DIRECTIONS: tuple[tuple[int, int], ...] = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+# Lookup tables for a 4-bit neighbor mask (bit 0 = north, 1 = east, 2 = south, 3 = west)
+_POPCOUNT: np.ndarray = np.array([bin(mask).count("1") for mask in range(16)], dtype=np.int64) # Number of available directions
+_NEIGHBOR_PICK: np.ndarray = np.array([[d for d in range(4) if mask & (1 << d)] + [0] * (4 - _POPCOUNT[mask]) for mask in range(16)], dtype=np.int8) # Available directions, padded to 4
+_DECISION: np.ndarray = np.array([[_NEIGHBOR_PICK[mask, r % _POPCOUNT[mask]] if mask else 0 for r in range(256)] for mask in range(16)], dtype=np.int8) # Direction to take for a random byte
+
+# Per direction: offset to the neighbor, path bit for the current cell, path bit for the neighbor
+_STEP: np.ndarray = np.array([
+    (*_DIRECTIONS[NORTH], PATH_N, PATH_S),
+    (*_DIRECTIONS[EAST], PATH_E, PATH_W),
+    (*_DIRECTIONS[SOUTH], PATH_S, PATH_N),
+    (*_DIRECTIONS[WEST], PATH_W, PATH_E)
+], dtype=np.int16)
+
+@njit(cache=True)
+def _mark_visited(unvisitedNeighbors: np.ndarray, x: int, y: int):
+    """
+    Removes cell (x, y) from the unvisited neighbor masks of its neighbors.
+    """
+    height, width = unvisitedNeighbors.shape
+    if y > 0:
+        unvisitedNeighbors[y - 1, x] &= 0xF ^ (1 << SOUTH)
+    if x < width - 1:
+        unvisitedNeighbors[y, x + 1] &= 0xF ^ (1 << WEST)
+    if y < height - 1:
+        unvisitedNeighbors[y + 1, x] &= 0xF ^ (1 << NORTH)
+    if x > 0:
+        unvisitedNeighbors[y, x - 1] &= 0xF ^ (1 << EAST)
+
+@njit(cache=True)
+def _add_paths(cells: np.ndarray, x: int, y: int, paths: int):
+    """
+    Sets path bits of cell (x, y) in the packed cell grid.
+    """
+    cells[y, x >> 1] |= paths << ((x & 1) * 4)
+
+@njit(cache=True)
+def _advance(cells: np.ndarray, unvisitedNeighbors: np.ndarray, parentDir: np.ndarray, stackX: np.ndarray, stackY: np.ndarray, top: int, rngBuffer: np.ndarray, rngIndex: int) -> tuple[int, bool]:
+    """
+    Runs the backtracker until a new cell has been visited, or the stack is empty.
+    Uses rngBuffer[rngIndex] as random number if a new cell is visited.
+    Returns the new stack top, and whether a new cell has been visited.
+    """
+    while top > 0:
+        cx = stackX[top - 1]
+        cy = stackY[top - 1]
+        mask = unvisitedNeighbors[cy, cx]
+
+        # No unvisited neighbors, backtrack
+        if mask == 0:
+            top -= 1
+            continue
+
+        # Choose available neighbor at random
+        nextCellDir = _DECISION[mask, rngBuffer[rngIndex]]
+
+        dx = _STEP[nextCellDir, 0]
+        dy = _STEP[nextCellDir, 1]
+        nx = cx + dx
+        ny = cy + dy
+
+        # There's a path to the neighbor
+        _add_paths(cells, cx, cy, _STEP[nextCellDir, 2])
+
+        # There's a path from the neighbor, and the neighbor has been visited
+        _add_paths(cells, nx, ny, _STEP[nextCellDir, 3])
+        _mark_visited(unvisitedNeighbors, nx, ny)
+
+        # Remember the way back from the neighbor
+        parentDir[ny, nx] = (nextCellDir + 2) & 3
+
+        # Push neighbor pos to stack
+        stackX[top] = nx
+        stackY[top] = ny
+        return top + 1, True
+
+    return top, False
+
+@njit(cache=True)
+def _generate_full(cells: np.ndarray, unvisitedNeighbors: np.ndarray, parentDir: np.ndarray, stackX: np.ndarray, stackY: np.ndarray, top: int, rngBuffer: np.ndarray, rngIndex: int) -> tuple[int, int, int]:
+    """
+    Runs the backtracker until the maze is complete, or rngBuffer is used up.
+    Returns the new stack top, the new rngIndex, and the number of newly visited cells.
+    """
+    visitedCells = 0
+    while rngIndex < len(rngBuffer):
+        top, visitedNew = _advance(cells, unvisitedNeighbors, parentDir, stackX, stackY, top, rngBuffer, rngIndex)
+        if not visitedNew:
+            break
+        rngIndex += 1
+        visitedCells += 1
+    return top, rngIndex, visitedCells
+
+@njit(cache=True)
+def _trace_path(parentDir: np.ndarray, x: int, y: int, startX: int, startY: int, pathX: np.ndarray, pathY: np.ndarray) -> int:
+    """
+    Follows the parent directions from (x, y) back to (startX, startY) and
+    writes the positions along the way to pathX/pathY. Returns the path length.
+    """
+    n = 0
+    while True:
+        pathX[n] = x
+        pathY[n] = y
+        n += 1
+        if x == startX and y == startY:
+            return n
+        d = parentDir[y, x]
+        x += _STEP[d, 0]
+        y += _STEP[d, 1]
+
+def find_runs(mask: np.ndarray):
+    """
+    Finds runs of consecutive True values along the rows of a 2D boolean array.
+    Returns an iterable of (row, first column, last column) tuples.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    return zip(starts[:, 0].tolist(), starts[:, 1].tolist(), (ends[:, 1] - 1).tolist())
+
+@lru_cache(maxsize=64)
+def _render_text_pair(font, s: str):
+    """
+    Renders a text and its drop shadow. Cached, so showing the same text again doesn't rasterize it again.
+    """
+    return (font.render(s, True, COL_TEXT), font.render(s, True, COL_TEXT_DROP))
 
 def RenderStaticTextOverlay(font, randomSeed: int, pos: tuple[int, int]):
-    s = f"R: Random seed - G: Check goal - UP: Increase seed - DOWN: Decrease seed - LMB: New start pos - RMB: New goal pos - SPACE: Pause - RETURN: Clear"
-    return (font.render(s, True, COL_TEXT), font.render(s, True, COL_TEXT_DROP))
+    s = f"R: Random seed - G: Check goal - UP: Increase seed - DOWN: Decrease seed - LMB: New start pos - RMB: New goal pos - SPACE: Pause - RETURN: Clear - A: Toggle animation"
+    return _render_text_pair(font, s)
 
 def RenderHUDOverlay(font, randomSeed: int, startPos: tuple[int, int], goalPos: tuple[int, int], showGoal: bool):
     s = f"Seed: {randomSeed}, StartPos: {startPos}, showGoal: {showGoal}, GoalPos: {goalPos}"
-    return (font.render(s, True, COL_TEXT), font.render(s, True, COL_TEXT_DROP))
+    return _render_text_pair(font, s)
 
 class Maze:
-    # Properties a cell in the maze can have
-    class CELLFLAGS(enum.IntFlag):
-        CLEAR = 0 # Default value
-        CELL_PATH_N = enum.auto() # Connected to nothern neighbor
-        CELL_PATH_E = enum.auto() # Connected to eastern neighbor
-        CELL_PATH_S = enum.auto() # Connected to southern neighbor
-        CELL_PATH_W = enum.auto() # Connected to western neighbor
-        CELL_VISITED = enum.auto() # Cell has been visited
-
-    # Direction identifiers
-    class DIRECTION:
-        NORTH = 0
-        EAST = 1
-        SOUTH = 2
-        WEST = 3
-
-    # Directions
-    DIRECTIONS = [
-        (0, -1),
-        (1, 0),
-        (0, 1),
-        (-1, 0)
-    ]
-
-    def __init__(self, width: int, height: int, startPos: tuple[int, int], randomSeed: int):
+    def __init__(self, width: int, height: int, startPos: tuple[int, int], randomSeed: int, animate: bool = True):
         """
         Initializes data structures for a new maze.
+        If 'animate' is False, the maze is generated completely right away.
         """
         # Initialize
         self.width: int = width
         self.height: int = height
         self.size: int = width * height
-        self.cells: list[enum.IntFlag] = [Maze.CELLFLAGS.CLEAR for _ in range(self.size)]
+
+        # Keep the start position inside the maze
+        startPos = (min(max(startPos[0], 0), width - 1), min(max(startPos[1], 0), height - 1))
+
+        self.cells: np.ndarray = np.zeros((height, (width + 1) // 2), dtype=np.uint8) # Two cells per byte, even x in the low nibble
+        self.unvisitedNeighbors: np.ndarray = np.full((height, width), 0xF, dtype=np.uint8) # Per cell, directions with unvisited neighbors (bit 0 = north ... bit 3 = west, kept up to date by _mark_visited())
+        self.parentDir: np.ndarray = np.zeros((height, width), dtype=np.uint8) # Direction back to the cell each cell was reached from
+        self.startPos: tuple[int, int] = startPos
         self.visitedCells: int = 0
-        self.stack: collections.deque[(int, int)] = collections.deque(maxlen=None)
-        self.random = random.Random()
-        self.random.seed(randomSeed)
+        self.complete: bool = False
+        self.stackX: np.ndarray = np.empty(self.size, dtype=np.int16)
+        self.stackY: np.ndarray = np.empty_like(self.stackX)
+        self.top: int = 0
+        self.rng: np.random.Generator = np.random.default_rng(randomSeed & 0xFFFFFFFFFFFFFFFF) # Seed must not be negative
+        self.rngBuffer: np.ndarray = np.empty(0, dtype=np.uint8) # Random bytes, drawn in batches
+        self.rngIndex: int = 0
         self.goalPath: list[tuple[int, int]] = []
         self.goalFound: bool = False
         self.lastGoalPos: tuple[int, int] = ()
 
         # Begin
-        self.stack.append(startPos)
-        self.set_cell(startPos, Maze.CELLFLAGS.CELL_VISITED)
+        self.stackX[0], self.stackY[0] = startPos
+        self.top = 1
+        self.unvisitedNeighbors[0, :] &= 0xF ^ (1 << NORTH)
+        self.unvisitedNeighbors[:, -1] &= 0xF ^ (1 << EAST)
+        self.unvisitedNeighbors[-1, :] &= 0xF ^ (1 << SOUTH)
+        self.unvisitedNeighbors[:, 0] &= 0xF ^ (1 << WEST)
+        _mark_visited(self.unvisitedNeighbors, startPos[0], startPos[1])
         self.visitedCells = 1
+        self.complete = self.visitedCells >= self.size
 
-    def get_cell(self, pos: tuple[int, int]):
+        # Offscreen canvas, only changed cells get repainted
+        self.dirty: list[pygame.Rect] = [] # Areas repainted since the last display update
+        self._canvas = pygame.Surface(SCREEN_SIZE)
+        self._canvas.fill(COL_UNVISITED)
+        self.paint_cells(startPos[0], startPos[1], startPos[0], startPos[1])
+
+        if not animate:
+            self.generate_full()
+
+    def get_cell(self, pos: tuple[int, int]) -> int:
         """
         Returns the value of a cell by XY coordinate.
         """
-        return self.cells[pos[1] * self.width + pos[0]]
+        x, y = pos
+        cell = (int(self.cells[y, x >> 1]) >> ((x & 1) * 4)) & 0xF
+        if cell or pos == self.startPos:
+            cell |= VISITED
+        return cell
 
-    def set_cell(self, pos: tuple[int, int], cell):
+    def unpack_cells(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
         """
-        Sets the value of a cell by XY coordinate.
+        Returns the values of the cells from (x0, y0) to (x1, y1) (inclusive)
+        as one uint8 per cell, indexed [y, x], including the VISITED bit.
         """
-        self.cells[pos[1] * self.width + pos[0]] = cell
-
-    def offset(self, pos: tuple[int, int], off: tuple[int, int]) -> tuple[int, int]:
+        packed = self.cells[y0:y1 + 1, x0 >> 1:(x1 >> 1) + 1]
+        unpacked = np.empty((packed.shape[0], packed.shape[1] * 2), dtype=np.uint8)
+        unpacked[:, 0::2] = packed & 0xF
+        unpacked[:, 1::2] = packed >> 4
+        cells = unpacked[:, x0 & 1:(x0 & 1) + x1 - x0 + 1]
+        cells[cells != 0] |= VISITED
+
+        # Start cell counts as visited
+        startX, startY = self.startPos
+        if x0 <= startX <= x1 and y0 <= startY <= y1:
+            cells[startY - y0, startX - x0] |= VISITED
+        return cells
+
+    def refill_rng_buffer(self):
         """
-        Returns a tuple with new coordinates that are offset from
-        the current coordinate (which is the top item on the stack).
-        """
-        return (pos[0] + off[0], pos[1] + off[1])
-
-    def get_unvisited_neighbors(self, pos: tuple[int, int]) -> list[tuple[int, int]]:
+        Draws a new batch of random bytes.
         """
-        Returns a list with coordinates of unvisited cells neighbored to 'pos'.
-        """
-        # Create list of unvisited neighbors
-        unvisitedNeighbors = []
-
-        # North neighbor
-        if pos[1] > 0 and Maze.CELLFLAGS.CELL_VISITED not in self.get_cell(self.offset(pos, Maze.DIRECTIONS[Maze.DIRECTION.NORTH])):
-            unvisitedNeighbors.append(Maze.DIRECTION.NORTH)
-
-        # East neighbor
-        if pos[0] < self.width - 1 and Maze.CELLFLAGS.CELL_VISITED not in self.get_cell(self.offset(pos, Maze.DIRECTIONS[Maze.DIRECTION.EAST])):
-            unvisitedNeighbors.append(Maze.DIRECTION.EAST)
-
-        # South neighbor
-        if pos[1] < self.height - 1 and Maze.CELLFLAGS.CELL_VISITED not in self.get_cell(self.offset(pos, Maze.DIRECTIONS[Maze.DIRECTION.SOUTH])):
-            unvisitedNeighbors.append(Maze.DIRECTION.SOUTH)
-
-        # West neighbor
-        if pos[0] > 0 and Maze.CELLFLAGS.CELL_VISITED not in self.get_cell(self.offset(pos, Maze.DIRECTIONS[Maze.DIRECTION.WEST])):
-            unvisitedNeighbors.append(Maze.DIRECTION.WEST)
-
-        return unvisitedNeighbors
+        self.rngBuffer = self.rng.integers(0, 256, size=RNG_BATCH_SIZE, dtype=np.uint8)
+        self.rngIndex = 0
 
     def advance(self) -> tuple[bool, bool]:
         """
-        Advances maze algorithm by one step.
+        Advances maze algorithm until a new cell has been visited.
         """
         # If the maze has already been filled completely, abort
-        if self.visitedCells >= self.size:
+        if self.complete:
             return False, False
 
-        currentPos = self.stack[-1]
-
-        # Step 1: Create set of unvisited neighbors
-        unvisitedNeighbors = self.get_unvisited_neighbors(currentPos)
-
-        # Are there any unvisited neighbors?
-        if unvisitedNeighbors:
-            # Choose available neighbor at random
-            nextCellDir = self.random.choice(unvisitedNeighbors)
-
-            if nextCellDir == Maze.DIRECTION.NORTH:
-                neighborPos = self.offset(currentPos, Maze.DIRECTIONS[Maze.DIRECTION.NORTH])
-                
-                # There's a path to the neighbor
-                self.set_cell(currentPos, self.get_cell(currentPos) | Maze.CELLFLAGS.CELL_PATH_N)
-
-                # There's a path from the neighbor, and the neighbor has been visited
-                self.set_cell(neighborPos, self.get_cell(neighborPos) | Maze.CELLFLAGS.CELL_PATH_S | Maze.CELLFLAGS.CELL_VISITED)
-
-            elif nextCellDir == Maze.DIRECTION.EAST:
-                neighborPos = self.offset(currentPos, Maze.DIRECTIONS[Maze.DIRECTION.EAST])
-                
-                # There's a path to the neighbor
-                self.set_cell(currentPos, self.get_cell(currentPos) | Maze.CELLFLAGS.CELL_PATH_E)
-
-                # There's a path from the neighbor, and the neighbor has been visited
-                self.set_cell(neighborPos, self.get_cell(neighborPos) | Maze.CELLFLAGS.CELL_PATH_W | Maze.CELLFLAGS.CELL_VISITED)
-
-            elif nextCellDir == Maze.DIRECTION.SOUTH:
-                neighborPos = self.offset(currentPos, Maze.DIRECTIONS[Maze.DIRECTION.SOUTH])
-                
-                # There's a path to the neighbor
-                self.set_cell(currentPos, self.get_cell(currentPos) | Maze.CELLFLAGS.CELL_PATH_S)
-
-                # There's a path from the neighbor, and the neighbor has been visited
-                self.set_cell(neighborPos, self.get_cell(neighborPos) | Maze.CELLFLAGS.CELL_PATH_N | Maze.CELLFLAGS.CELL_VISITED)
-
-            elif nextCellDir == Maze.DIRECTION.WEST:
-                neighborPos = self.offset(currentPos, Maze.DIRECTIONS[Maze.DIRECTION.WEST])
-                
-                # There's a path to the neighbor
-                self.set_cell(currentPos, self.get_cell(currentPos) | Maze.CELLFLAGS.CELL_PATH_W)
-
-                # There's a path from the neighbor, and the neighbor has been visited
-                self.set_cell(neighborPos, self.get_cell(neighborPos) | Maze.CELLFLAGS.CELL_PATH_E | Maze.CELLFLAGS.CELL_VISITED)
-            
-            # Push neighbor pos to stack, increase visited counter
-            self.stack.append(neighborPos)
-            self.visitedCells += 1
+        if self.rngIndex >= len(self.rngBuffer):
+            self.refill_rng_buffer()
 
-            return True, True
+        self.top, visitedNew = _advance(self.cells, self.unvisitedNeighbors, self.parentDir, self.stackX, self.stackY, self.top, self.rngBuffer, self.rngIndex)
+        if visitedNew:
+            self.rngIndex += 1
+            self.visitedCells += 1
+            self.complete = self.visitedCells >= self.size
 
-        else:
-            # Backtrack
-            self.stack.pop()
+            # Repaint the new cell and the cell it was reached from. The latter
+            # lost a wall, which also reached into the neighboring cells.
+            top = self.top
+            newX, newY = int(self.stackX[top - 1]), int(self.stackY[top - 1])
+            fromX, fromY = int(self.stackX[top - 2]), int(self.stackY[top - 2])
+            self.paint_cells(min(newX, fromX) - 1, min(newY, fromY) - 1, max(newX, fromX) + 1, max(newY, fromY) + 1)
 
         # Still advancing
-        return True, False
+        return True, visitedNew
+
+    def generate_full(self):
+        """
+        Runs the maze algorithm to completion, then repaints the whole maze.
+        """
+        while self.visitedCells < self.size:
+            if self.rngIndex >= len(self.rngBuffer):
+                self.refill_rng_buffer()
+            self.top, self.rngIndex, visitedCells = _generate_full(self.cells, self.unvisitedNeighbors, self.parentDir, self.stackX, self.stackY, self.top, self.rngBuffer, self.rngIndex)
+            if visitedCells == 0:
+                break
+            self.visitedCells += visitedCells
+        self.complete = self.visitedCells >= self.size
+
+        self.paint_cells(0, 0, self.width - 1, self.height - 1)
 
     def check_goal_reached(self, goalPos: tuple[int, int]) -> bool:
         """
@@ -210,60 +342,82 @@ class Maze:
         if self.goalFound and goalPos == self.lastGoalPos:
             return True
 
-        # Find goalPos in stack
-        reversedStack = reversed(self.stack)
-        path: list[tuple[int, int]] = []
-        found = False
-        for currentPos in reversedStack:
-            if currentPos == goalPos:
-                found = True
-            if found:
-                path.append(currentPos)
-        self.goalPath = path
+        self.goalPath = []
         self.lastGoalPos = goalPos
-        self.goalFound = found
-        return found
+        self.goalFound = False
+
+        # Goal not reached (yet)
+        goalX, goalY = goalPos
+        if not (0 <= goalX < self.width and 0 <= goalY < self.height) or not self.get_cell(goalPos) & VISITED:
+            return False
+
+        # Walk back from goalPos to startPos
+        pathX = np.empty(self.size, dtype=np.int16)
+        pathY = np.empty_like(pathX)
+        n = _trace_path(self.parentDir, goalX, goalY, self.startPos[0], self.startPos[1], pathX, pathY)
+        self.goalPath = list(zip(pathX[:n].tolist(), pathY[:n].tolist()))
+        self.goalFound = True
+        return True
+
+    def paint_cells(self, x0: int, y0: int, x1: int, y1: int):
+        """
+        Repaints the cells from (x0, y0) to (x1, y1) (inclusive) on the offscreen canvas.
+        """
+        x0 = max(x0, 0)
+        y0 = max(y0, 0)
+        x1 = min(x1, self.width - 1)
+        y1 = min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+
+        canvas = self._canvas
+        blockSize = BLOCK_SIZE
+        lineWidth = LINE_WIDTH
+        colLine = COL_LINE
+        drawLine = pygame.draw.line
+
+        # Walls reach into neighboring cells (one pixel, or more for thick lines),
+        # so the walls of the cells around the repainted ones have to be redrawn
+        wallX0 = max(x0 - 1, 0)
+        wallY0 = max(y0 - 1, 0)
+        c = self.unpack_cells(wallX0, wallY0, min(x1 + 1, self.width - 1), min(y1 + 1, self.height - 1))
+        visitedMask = (c & VISITED) != 0
+        eastWalls = visitedMask & ((c & PATH_E) == 0)
+        southWalls = visitedMask & ((c & PATH_S) == 0)
+
+        # Cell backgrounds: one pixel per cell, scaled up to block size (surfarray is indexed [x, y])
+        colors = np.where(visitedMask[y0 - wallY0:y1 - wallY0 + 1, x0 - wallX0:x1 - wallX0 + 1].T[..., np.newaxis], np.array(COL_BACKGROUND, dtype=np.uint8), np.array(COL_UNVISITED, dtype=np.uint8))
+        background = pygame.surfarray.make_surface(colors)
+        rect = pygame.Rect(x0 * blockSize, y0 * blockSize, (x1 - x0 + 1) * blockSize, (y1 - y0 + 1) * blockSize)
+        canvas.blit(pygame.transform.scale(background, rect.size), rect)
+        self.dirty.append(rect)
+
+        # East walls, one line per vertical run
+        for x, yStart, yEnd in find_runs(eastWalls.T):
+            block_x = (wallX0 + x) * blockSize
+            drawLine(canvas, colLine, (block_x + blockSize - 1, (wallY0 + yStart) * blockSize - 1), (block_x + blockSize - 1, (wallY0 + yEnd) * blockSize + blockSize - 1), lineWidth)
+
+        # South walls, one line per horizontal run
+        for y, xStart, xEnd in find_runs(southWalls):
+            block_y = (wallY0 + y) * blockSize
+            drawLine(canvas, colLine, ((wallX0 + xStart) * blockSize - 1, block_y + blockSize - 1), ((wallX0 + xEnd) * blockSize + blockSize - 1, block_y + blockSize - 1), lineWidth)
 
     def draw(self, canvas):
         """
         Draws the maze in its current state.
         """
-        for y in range(0, self.height):
-            for x in range(0, self.width):
-                block_x = x * BLOCK_SIZE
-                block_y = y * BLOCK_SIZE
-                current_cell = self.get_cell((x, y))
-                if Maze.CELLFLAGS.CELL_VISITED in current_cell:
-                    rect = pygame.Rect(block_x, block_y, BLOCK_SIZE, BLOCK_SIZE)
-                    canvas.fill(COL_BACKGROUND, rect)
-                    pass
-
-        for y in range(0, self.height):
-            for x in range(0, self.width):
-                block_x = x * BLOCK_SIZE
-                block_y = y * BLOCK_SIZE
-                current_cell = self.get_cell((x, y))
-                if not Maze.CELLFLAGS.CELL_VISITED in current_cell:
-                    continue
-
-                # East wall
-                if not Maze.CELLFLAGS.CELL_PATH_E in current_cell:
-                    pygame.draw.line(canvas, COL_LINE, (block_x + BLOCK_SIZE - 1, block_y - 1), (block_x + BLOCK_SIZE - 1, block_y + BLOCK_SIZE - 1), LINE_WIDTH)
-                # South wall
-                if not Maze.CELLFLAGS.CELL_PATH_S in current_cell:
-                    pygame.draw.line(canvas, COL_LINE, (block_x - 1, block_y + BLOCK_SIZE - 1), (block_x + BLOCK_SIZE - 1, block_y + BLOCK_SIZE - 1), LINE_WIDTH)
+        canvas.blit(self._canvas, (0, 0))
 
     def draw_goal_path(self, canvas):
         """
         Draws the goal path, if there is one.
         """
+        if len(self.goalPath) < 2:
+            return
+
         halfBlockSize = int(BLOCK_SIZE / 2) - 1
-        previousPos = None
-        for pos in self.goalPath:
-            pos = (pos[0] * BLOCK_SIZE + halfBlockSize, pos[1] * BLOCK_SIZE + halfBlockSize)
-            if previousPos is not None:
-                pygame.draw.line(canvas, COL_GOAL, previousPos, pos, LINE_WIDTH_GOAL)
-            previousPos = pos
+        points = [(pos[0] * BLOCK_SIZE + halfBlockSize, pos[1] * BLOCK_SIZE + halfBlockSize) for pos in self.goalPath]
+        pygame.draw.lines(canvas, COL_GOAL, False, points, LINE_WIDTH_GOAL)
 
 def main():
     # PyGame
@@ -289,6 +443,58 @@ def main():
     isRunning = True
     isAdvancing = True
     checkGoal = True
+    animateMaze = True
+    needsFullUpdate = True
+    goalFoundShown = False
+
+    # Keyboard handlers
+    def toggle_pause():
+        nonlocal isAdvancing
+        isAdvancing = not isAdvancing
+
+    def clear_maze():
+        nonlocal maze
+        maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed, animateMaze)
+        screen.fill(COL_UNVISITED)
+
+    def random_seed():
+        nonlocal randomSeed, maze, hudTextOverlays
+        randomSeed = random.randint(1, 9999)
+        maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed, animateMaze)
+        hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
+
+    def toggle_goal():
+        nonlocal checkGoal, hudTextOverlays
+        checkGoal = not checkGoal
+        hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
+
+    def increase_seed():
+        nonlocal randomSeed, maze, hudTextOverlays
+        randomSeed += 1
+        maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed, animateMaze)
+        hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
+
+    def decrease_seed():
+        nonlocal randomSeed, maze, hudTextOverlays
+        randomSeed -= 1
+        maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed, animateMaze)
+        hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
+
+    def toggle_animation():
+        nonlocal animateMaze, maze
+        animateMaze = not animateMaze
+        maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed, animateMaze)
+
+    keyHandlers = {
+        pygame.K_SPACE: toggle_pause,
+        pygame.K_RETURN: clear_maze,
+        pygame.K_r: random_seed,
+        pygame.K_g: toggle_goal,
+        pygame.K_UP: increase_seed,
+        pygame.K_DOWN: decrease_seed,
+        pygame.K_a: toggle_animation
+    }
+
     while isRunning:
         # Event handling
         for event in pygame.event.get():
@@ -297,57 +503,54 @@ def main():
                 pygame.quit()
                 quit()
 
+            # Window needs to be redrawn
+            elif event.type == pygame.VIDEOEXPOSE:
+                needsFullUpdate = True
+
             elif event.type == pygame.KEYDOWN:
                 # print(event.key)
-                if event.key == 32: # SPACE
-                    isAdvancing = not isAdvancing
-                elif event.key == 13: #RETURN
-                    maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed)
-                    screen.fill(COL_UNVISITED)
-                elif event.key == 114: # R
-                    randomSeed = random.randint(1, 9999)
-                    maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed)
-                    hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
-                elif event.key == 103: # G
-                    checkGoal = not checkGoal
-                    hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
-                elif event.key == 1073741906: # UP
-                    randomSeed += 1
-                    maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed)
-                    hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
-                elif event.key == 1073741905: # DOWN
-                    randomSeed -= 1
-                    maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed)
-                    hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
+                needsFullUpdate = True
+                handler = keyHandlers.get(event.key)
+                if handler is not None:
+                    handler()
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                needsFullUpdate = True
                 mousePos = event.pos
-                mazeMousePos = (int(mousePos[0] / BLOCK_SIZE), int(mousePos[1] / BLOCK_SIZE))
+                mazeMousePos = (min(int(mousePos[0] / BLOCK_SIZE), mazeWidth - 1), min(int(mousePos[1] / BLOCK_SIZE), mazeHeight - 1))
                 button = event.button
                 # Left mouse button down
                 if button == 1:
                     mazeStartPos = mazeMousePos
-                    maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed)
+                    maze = Maze(mazeWidth, mazeHeight, mazeStartPos, randomSeed, animateMaze)
                     hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
                 # Right mouse button down
                 elif button == 3:
                     mazeGoalPos = mazeMousePos
                     hudTextOverlays = RenderHUDOverlay(font, randomSeed, mazeStartPos, mazeGoalPos, checkGoal)
 
-        # Update and draw maze
-        if isAdvancing:
-            screen.fill(COL_UNVISITED)
+        # Update maze
+        mazeChanged = False
+        if isAdvancing and not maze.complete:
             for _ in range(FRAMESKIP + 1):
                 needsUpdate = False
-                while not needsUpdate and isAdvancing:
-                    isAdvancing, needsUpdate = maze.advance()
-                    if checkGoal:
-                        maze.check_goal_reached(mazeGoalPos)
+                while not needsUpdate and not maze.complete:
+                    _, needsUpdate = maze.advance()
+            mazeChanged = True
+
+        # Draw maze. Once it is complete (or paused), the screen only changes on events.
+        if mazeChanged or needsFullUpdate:
+            if checkGoal:
+                maze.check_goal_reached(mazeGoalPos)
             maze.draw(screen)
 
             halfLineWidth = int(LINE_WIDTH / 2)
 
             if checkGoal:
+                # Goal path has appeared or disappeared
+                if maze.goalFound != goalFoundShown:
+                    goalFoundShown = maze.goalFound
+                    needsFullUpdate = True
                 maze.draw_goal_path(screen)
                 rect = pygame.Rect(mazeGoalPos[0] * BLOCK_SIZE + halfLineWidth, mazeGoalPos[1] * BLOCK_SIZE + halfLineWidth, BLOCK_SIZE - LINE_WIDTH, BLOCK_SIZE - LINE_WIDTH)
                 screen.fill(COL_GOAL, rect)
@@ -361,8 +564,13 @@ def main():
             screen.blit(staticTextOverlays[1], (11, 31))
             screen.blit(staticTextOverlays[0], (10, 30))
 
-        # Update display & tick
-        pygame.display.update()
+        # Update display & tick. Overlays only change on events, otherwise just the repainted cells need updating.
+        if needsFullUpdate:
+            pygame.display.update()
+            needsFullUpdate = False
+        elif maze.dirty:
+            pygame.display.update(maze.dirty)
+        maze.dirty.clear()
         clock.tick(FPS)
 
 if __name__ == "__main__":